@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: 2025-present Xiang Wang <ramwin@qq.com>
+#
+# SPDX-License-Identifier: MIT
+
+"""
+按 address 分组的 backward asof 查找内核
+
+安装了 numba 时，asof_backward 在导入时按显式签名编译，并把机器码缓存到磁盘，
+之后的进程直接加载缓存，首次 match 不再有 JIT 编译开销；
+B 的各行互不依赖，由 prange 分配到多个线程并行查找；
+未安装 numba 时 asof_backward 为 None
+"""
+
+try:
+    import numba
+except ImportError:
+    numba = None  # type: ignore[assignment]
+
+
+if numba is not None:
+    @numba.njit('void(int64[:], int64[:], int64[:], int64[:], int64[:])',
+                parallel=True, cache=True)
+    def asof_backward(codes_b, ranks_b, ranks_a_sorted, group_starts, out_idx):
+        """
+        对 B 的每一行，在 A 同 address 分组内二分查找最后一个
+        cycle 排名不大于当前行的位置，写入 out_idx，找不到时写入 -1
+
+        Args:
+            codes_b: B 每一行的 address 编码，-1 表示 A 中不存在
+            ranks_b: B 每一行 cycle 在 A 中的排名
+            ranks_a_sorted: 按 (address, cycle) 排序后 A 的 cycle 排名
+            group_starts: 每个 address 分组在 A 排序后数组中的起始位置，长度为分组数 + 1
+            out_idx: 输出的匹配位置
+        """
+        for i in numba.prange(len(codes_b)):
+            code = codes_b[i]
+            if code < 0:
+                out_idx[i] = -1
+                continue
+            lo = group_starts[code]
+            hi = group_starts[code + 1]
+            start = lo
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if ranks_a_sorted[mid] <= ranks_b[i]:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            out_idx[i] = lo - 1 if lo > start else -1
+else:
+    asof_backward = None
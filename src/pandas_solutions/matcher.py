@@ -9,8 +9,11 @@ DataFrame 匹配器模块
 
 import logging
 from typing import Optional, List, Dict, Any
+import numpy as np
 import pandas as pd
 
+from ._asof_kernel import asof_backward
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -25,13 +28,25 @@ class DataFrameMatcher:
 
     目标：为 DataFrame B 的每一行找到 DataFrame A 中相同 address 下
     cycle 值小于等于当前行 cycle 的最大 cycle 记录，并添加对应的 data 信息
+
+    address 字段可以是 category 类型，此时直接使用其整数编码，
+    不再对每一行的字符串做哈希
     """
 
     def __init__(self):
         """初始化匹配器"""
         self._df_a: Optional[pd.DataFrame] = None
         self._df_b: Optional[pd.DataFrame] = None
-        self._indexed_df_a: Optional[pd.DataFrame] = None
+        self._index_built = False
+        self._addr_uniques: Optional[pd.Index] = None
+        self._cycle_uniques: Optional[np.ndarray] = None
+        self._codes_a_sorted: Optional[np.ndarray] = None
+        self._keys_a_sorted: Optional[np.ndarray] = None
+        self._ranks_a_sorted: Optional[np.ndarray] = None
+        self._group_starts: Optional[np.ndarray] = None
+        self._data_a_sorted: Optional[pd.api.extensions.ExtensionArray] = None
+        self._stats_a: Optional[Dict[str, Any]] = None
+        self._stats_b: Optional[Dict[str, Any]] = None
         logger.info("DataFrameMatcher 初始化完成")
 
     def set_dataframes(
@@ -42,33 +57,98 @@ class DataFrameMatcher:
         """
         设置要匹配的两个 DataFrame
 
+        传入的 DataFrame 以引用方式保存，不会被复制。DataFrame A 的索引在
+        首次调用 match 时建立并缓存，之后如果原地修改了 df_a，需要重新调用
+        set_dataframes 或 set_df_a，否则 match 仍使用旧的索引。
+
         Args:
             df_a: 包含 address, data, cycle 字段的 DataFrame
             df_b: 包含 cycle, address, way, set 字段的 DataFrame
 
         Raises:
-            ValueError: 当 DataFrame 缺少必需字段时抛出异常
+            ValueError: 当 DataFrame 缺少必需字段或 cycle 包含空值时抛出异常
         """
-        # 验证 DataFrame A 的字段
+        self._validate_df_a(df_a)
+        self._validate_df_b(df_b)
+
+        # 匹配过程不会修改传入的 DataFrame，直接保存引用以避免整表复制
+        self._df_a = df_a
+        self._df_b = df_b
+        self._stats_a = None
+        self._stats_b = None
+
+        logger.info(f"设置 DataFrame A: {len(df_a)} 行, {len(df_a.columns)} 列")
+        logger.info(f"设置 DataFrame B: {len(df_b)} 行, {len(df_b.columns)} 列")
+
+        self._reset_index()
+
+    def set_df_a(self, df_a: pd.DataFrame) -> None:
+        """
+        单独设置 DataFrame A，会使已建立的索引失效
+
+        Args:
+            df_a: 包含 address, data, cycle 字段的 DataFrame
+
+        Raises:
+            ValueError: 当 DataFrame 缺少必需字段或 cycle 包含空值时抛出异常
+        """
+        self._validate_df_a(df_a)
+        self._df_a = df_a
+        self._stats_a = None
+        logger.info(f"设置 DataFrame A: {len(df_a)} 行, {len(df_a.columns)} 列")
+        self._reset_index()
+
+    def set_df_b(self, df_b: pd.DataFrame) -> None:
+        """
+        单独设置 DataFrame B，保留 DataFrame A 已建立的索引
+
+        用同一个 DataFrame A 依次匹配多个 DataFrame B 时，
+        只有第一次 match 需要排序和编码 A
+
+        Args:
+            df_b: 包含 cycle, address, way, set 字段的 DataFrame
+
+        Raises:
+            ValueError: 当 DataFrame 缺少必需字段或 cycle 包含空值时抛出异常
+        """
+        self._validate_df_b(df_b)
+        self._df_b = df_b
+        self._stats_b = None
+        logger.info(f"设置 DataFrame B: {len(df_b)} 行, {len(df_b.columns)} 列")
+
+    @staticmethod
+    def _validate_df_a(df_a: pd.DataFrame) -> None:
+        """验证 DataFrame A 的字段和 cycle"""
         required_cols_a = {'address', 'data', 'cycle'}
-        if not required_cols_a.issubset(set(df_a.columns)):
-            missing_cols = required_cols_a - set(df_a.columns)
+        missing_cols = required_cols_a - set(df_a.columns)
+        if missing_cols:
             raise ValueError(f"DataFrame A 缺少必需字段: {missing_cols}")
 
-        # 验证 DataFrame B 的字段
+        # cycle 为空时无法确定匹配位置
+        if df_a['cycle'].isna().any():
+            raise ValueError("DataFrame A 的 cycle 字段包含空值")
+
+    @staticmethod
+    def _validate_df_b(df_b: pd.DataFrame) -> None:
+        """验证 DataFrame B 的字段和 cycle"""
         required_cols_b = {'cycle', 'address', 'way', 'set'}
-        if not required_cols_b.issubset(set(df_b.columns)):
-            missing_cols = required_cols_b - set(df_b.columns)
+        missing_cols = required_cols_b - set(df_b.columns)
+        if missing_cols:
             raise ValueError(f"DataFrame B 缺少必需字段: {missing_cols}")
 
-        self._df_a = df_a.copy()
-        self._df_b = df_b.copy()
+        if df_b['cycle'].isna().any():
+            raise ValueError("DataFrame B 的 cycle 字段包含空值")
 
-        logger.info(f"设置 DataFrame A: {len(df_a)} 行, {len(df_a.columns)} 列")
-        logger.info(f"设置 DataFrame B: {len(df_b)} 行, {len(df_b.columns)} 列")
-
-        # 重置索引状态
-        self._indexed_df_a = None
+    def _reset_index(self) -> None:
+        """重置 DataFrame A 的索引状态"""
+        self._index_built = False
+        self._addr_uniques = None
+        self._cycle_uniques = None
+        self._codes_a_sorted = None
+        self._keys_a_sorted = None
+        self._ranks_a_sorted = None
+        self._group_starts = None
+        self._data_a_sorted = None
 
     def _build_index(self) -> None:
         """
@@ -80,12 +160,35 @@ class DataFrameMatcher:
 
         logger.info("开始为 DataFrame A 建立索引...")
 
-        # 按 address 和 cycle 排序，确保每个 address 组内 cycle 是有序的
-        self._indexed_df_a = (self._df_a
-                              .sort_values(['address', 'cycle'])
-                              .reset_index(drop=True))
-
-        unique_addresses = self._indexed_df_a['address'].nunique()
+        # 将 address 编码为 int64
+        addr_a = self._df_a['address']
+        if isinstance(addr_a.dtype, pd.CategoricalDtype):
+            codes_a = addr_a.cat.codes.to_numpy().astype(np.int64)
+            self._addr_uniques = pd.Index(addr_a.cat.categories)
+        else:
+            codes_a, self._addr_uniques = pd.factorize(addr_a)
+
+        # 将 cycle 映射为其在 A 中的排名 (1..U)，与 address 编码组合成单个 int64 键，
+        # 按组合键排序即按 address 和 cycle 排序，只需一次整数 argsort，
+        # 且组合键整体有序，匹配时只需一次 searchsorted
+        self._cycle_uniques, cycle_inverse = np.unique(
+            self._df_a['cycle'].to_numpy(), return_inverse=True)
+        key_base = len(self._cycle_uniques) + 1
+        keys_a = codes_a * key_base + (cycle_inverse + 1)
+        order = np.argsort(keys_a, kind='stable')
+
+        # 只对匹配用到的列排序，不复制整个 DataFrame
+        self._keys_a_sorted = keys_a[order]
+        self._codes_a_sorted = codes_a[order]
+        self._ranks_a_sorted = cycle_inverse[order] + 1
+        self._data_a_sorted = self._df_a['data'].array.take(order)
+
+        # 每个 address 分组在排序后数组中的起止位置，供 numba 内核使用
+        self._group_starts = np.searchsorted(
+            self._codes_a_sorted, np.arange(len(self._addr_uniques) + 1))
+        self._index_built = True
+
+        unique_addresses = len(self._addr_uniques)
         logger.info(f"索引建立完成，共 {unique_addresses} 个唯一地址")
 
     def match(self) -> pd.DataFrame:
@@ -104,45 +207,31 @@ class DataFrameMatcher:
         logger.info("开始执行 DataFrame 匹配...")
 
         # 建立索引
-        if self._indexed_df_a is None:
+        if not self._index_built:
             self._build_index()
+        assert self._addr_uniques is not None and self._data_a_sorted is not None
+
+        # DataFrame A 中不存在的 address 编码为 -1
+        addr_b = self._df_b['address']
+        if isinstance(addr_b.dtype, pd.CategoricalDtype):
+            # 只对 B 的类别查找一次编码，再按 B 的 codes 展开；
+            # 末尾追加的 -1 对应 B 中 codes 为 -1 的空值
+            cat_codes = self._addr_uniques.get_indexer(addr_b.cat.categories)
+            codes_b = np.append(cat_codes, -1)[addr_b.cat.codes.to_numpy()]
+        else:
+            codes_b = self._addr_uniques.get_indexer(pd.Index(addr_b, copy=False))
 
-        # 由于 merge_asof 在某些情况下对排序要求严格，
-        # 我们采用分组处理的方法确保正确性
-        results = []
-        original_index = self._df_b.reset_index(drop=False)
-
-        for address in self._df_b['address'].unique():
-            # 获取当前 address 的数据
-            left_group = original_index[original_index['address'] == address].sort_values('cycle')
-            right_group = self._indexed_df_a[
-                self._indexed_df_a['address'] == address
-            ][['cycle', 'data']].sort_values('cycle')
-
-            if len(right_group) > 0:
-                # 对每个 address 组进行 merge_asof
-                merged = pd.merge_asof(
-                    left=left_group,
-                    right=right_group,
-                    on='cycle',
-                    direction='backward'
-                )
-                results.append(merged)
-            else:
-                # 如果 DataFrame A 中没有这个 address，添加 NaN data
-                merged = left_group.copy()
-                merged['data'] = None
-                results.append(merged)
-
-        # 合并所有结果并恢复原始顺序
-        if results:
-            result_df = pd.concat(results, ignore_index=True)
-            result_df = result_df.set_index('index').sort_index()
-            result_df.index.name = None
+        if len(codes_b) and (codes_b < 0).all():
+            # 没有相同的 address 时无需查找，全部为缺失值
+            logger.warning("DataFrame B 的 address 均不在 DataFrame A 中，所有行均无匹配")
+            match_idx = np.full(len(codes_b), -1, dtype=np.int64)
         else:
-            # 如果没有任何匹配，返回原始 DataFrame B 加上空的 data 列
-            result_df = self._df_b.copy()
-            result_df['data'] = None
+            match_idx = self._match_positions(codes_b)
+
+        # -1 位置填充为缺失值；全部匹配时不填充，保留 data 的原始 dtype
+        has_missing = bool((match_idx < 0).any())
+        result_df = self._df_b.assign(
+            data=self._data_a_sorted.take(match_idx, allow_fill=has_missing))
 
         matched_count = result_df['data'].notna().sum()
         total_count = len(result_df)
@@ -152,6 +241,44 @@ class DataFrameMatcher:
 
         return result_df
 
+    def _match_positions(self, codes_b: np.ndarray) -> np.ndarray:
+        """
+        查找 DataFrame B 每一行在排序后 DataFrame A 中的匹配位置
+
+        Args:
+            codes_b: B 每一行的 address 编码，-1 表示 A 中不存在
+
+        Returns:
+            np.ndarray: 匹配位置，无匹配时为 -1
+        """
+        assert self._df_b is not None and self._cycle_uniques is not None
+        assert self._ranks_a_sorted is not None and self._group_starts is not None
+        assert self._keys_a_sorted is not None and self._codes_a_sorted is not None
+
+        # B 的 cycle 映射为 A 中不超过它的 cycle 个数 (0..U)
+        ranks_b = np.searchsorted(
+            self._cycle_uniques, self._df_b['cycle'].to_numpy(), side='right')
+
+        if asof_backward is not None:
+            # 安装了 numba 时由编译后的内核在各 address 分组内二分查找
+            match_idx = np.empty(len(codes_b), dtype=np.int64)
+            asof_backward(codes_b.astype(np.int64, copy=False),
+                          ranks_b.astype(np.int64, copy=False),
+                          self._ranks_a_sorted.astype(np.int64, copy=False),
+                          self._group_starts.astype(np.int64, copy=False),
+                          match_idx)
+        else:
+            # 在组合键上查找最后一个不大于它的位置即为同 address 下的 asof 匹配
+            keys_b = codes_b * (len(self._cycle_uniques) + 1) + ranks_b
+            match_idx = np.searchsorted(self._keys_a_sorted, keys_b, side='right') - 1
+
+            # 落到其他 address 分组（或 address 不存在于 A）的位置视为无匹配
+            hit = (match_idx >= 0) & (codes_b >= 0)
+            hit[hit] = self._codes_a_sorted[match_idx[hit]] == codes_b[hit]
+            match_idx[~hit] = -1
+
+        return match_idx
+
     def get_match_statistics(self) -> Dict[str, Any]:
         """
         获取匹配统计信息
@@ -162,14 +289,43 @@ class DataFrameMatcher:
         if self._df_a is None or self._df_b is None:
             return {}
 
+        # 统计结果随 DataFrame 缓存，重新设置对应的 DataFrame 时失效
+        if self._stats_a is None:
+            self._stats_a = self._frame_statistics(self._df_a)
+        if self._stats_b is None:
+            self._stats_b = self._frame_statistics(self._df_b)
+
         stats = {
-            'df_a_rows': len(self._df_a),
-            'df_b_rows': len(self._df_b),
-            'unique_addresses_a': self._df_a['address'].nunique(),
-            'unique_addresses_b': self._df_b['address'].nunique(),
-            'df_a_cycle_range': (self._df_a['cycle'].min(), self._df_a['cycle'].max()),
-            'df_b_cycle_range': (self._df_b['cycle'].min(), self._df_b['cycle'].max()),
+            'df_a_rows': self._stats_a['rows'],
+            'df_b_rows': self._stats_b['rows'],
+            'unique_addresses_a': self._stats_a['unique_addresses'],
+            'unique_addresses_b': self._stats_b['unique_addresses'],
+            'df_a_cycle_range': self._stats_a['cycle_range'],
+            'df_b_cycle_range': self._stats_b['cycle_range'],
         }
 
         logger.info(f"统计信息: {stats}")
-        return stats
\ No newline at end of file
+        return stats
+
+    @staticmethod
+    def _frame_statistics(df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        统计单个 DataFrame 的行数、唯一地址数和 cycle 范围
+
+        Args:
+            df: 包含 address, cycle 字段的 DataFrame
+
+        Returns:
+            Dict[str, Any]: 包含 rows, unique_addresses, cycle_range 的字典
+        """
+        cycles = df['cycle'].to_numpy()
+        if len(cycles):
+            cycle_range = (np.min(cycles), np.max(cycles))
+        else:
+            cycle_range = (np.nan, np.nan)
+
+        return {
+            'rows': len(df),
+            'unique_addresses': df['address'].nunique(),
+            'cycle_range': cycle_range,
+        }
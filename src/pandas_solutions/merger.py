@@ -2,24 +2,44 @@
 # -*- coding: utf-8 -*-
 # Xiang Wang <ramwin@qq.com>
 
+import gzip
 import logging
 import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import IO, List, Optional, Union
 
 import pandas as pd
 
+try:
+    import pyarrow  # type: ignore[import-untyped]
+    import pyarrow.dataset  # type: ignore[import-untyped]
+    import pyarrow.feather  # type: ignore[import-untyped]
+    import pyarrow.parquet  # type: ignore[import-untyped]
+except ImportError:
+    pyarrow = None
+
 from .types import Dir, File
 
 logger = logging.getLogger(__name__)
 
+# 不排序合并时每次读取的行数
+CHUNK_SIZE = 100_000
+
+# 列式输出格式，需要安装 pyarrow，无法分块追加写入
+COLUMNAR_SUFFIXES = {'.parquet', '.feather'}
+
 
-def _read_csv_file(file_path: Union[str, Path]) -> pd.DataFrame:
-    """读取单个CSV文件的辅助函数，用于多进程处理
+def _read_csv_file(
+    file_path: Union[str, Path],
+    sort_fields: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """读取单个CSV文件的辅助函数，用于多线程并行读取
 
     Args:
         file_path: CSV文件路径
+        sort_fields: 排序字段列表，不为None时在读取后按其稳定排序
 
     Returns:
         读取的DataFrame
@@ -36,6 +56,9 @@ def _read_csv_file(file_path: Union[str, Path]) -> pd.DataFrame:
         else:
             df = pd.read_csv(file_path)
 
+        if sort_fields:
+            df = df.sort_values(by=sort_fields, kind='stable')
+
         logger.debug(f"成功读取文件 {file_path}，数据形状: {df.shape}")
         return df
     except Exception as e:
@@ -48,19 +71,20 @@ class Merger:
     合并一个文件夹的多个csv文件
 
     支持功能：
-    1. 多进程并行读取文件
+    1. 多线程并行读取文件（read_csv 解析时释放 GIL，且无需在进程间传递 DataFrame）
     2. 支持排序字段
-    3. 压缩保存
+    3. 压缩保存，输出文件后缀为 .parquet / .feather 时保存为列式格式
+    4. 不排序时分块流式合并，内存占用与文件总大小无关
     """
 
     def __init__(self, max_workers: Optional[int] = None):
         """初始化Merger
 
         Args:
-            max_workers: 最大工作进程数，默认为CPU核心数
+            max_workers: 最大工作线程数，默认为CPU核心数
         """
         self.max_workers = max_workers or mp.cpu_count()
-        logger.info(f"Merger初始化完成，最大工作进程数: {self.max_workers}")
+        logger.info(f"Merger初始化完成，最大工作线程数: {self.max_workers}")
 
     def merge_csv_files(
         self,
@@ -73,9 +97,12 @@ class Merger:
 
         Args:
             input_dir: 输入文件夹路径
-            output_file: 输出文件路径
+            output_file: 输出文件路径，后缀为 .parquet / .feather 时
+                保存为对应的列式格式（需要安装 pyarrow）
             sort_fields: 排序字段列表，为None时不排序
-            compression_level: 压缩等级 (0-9)，默认为6
+            compression_level: 压缩等级 (0-9)，默认为6，
+                作用于 .gz 的 gzip 压缩和 .parquet 的 zstd 压缩，
+                .feather 与未压缩的 CSV 忽略该参数
 
         Raises:
             ValueError: 当输入目录不存在或没有找到CSV文件时
@@ -96,23 +123,105 @@ class Merger:
 
         logger.info(f"找到 {len(csv_files)} 个CSV文件")
 
-        # 使用多进程读取文件
-        dataframes = self._read_files_parallel(csv_files)
+        columnar = output_file.suffix.lower() in COLUMNAR_SUFFIXES
+        if sort_fields or columnar:
+            # 全局排序和列式输出需要把所有数据读入内存，
+            # 列式输出由 pyarrow 数据集扫描完成读取、合并、排序和写出；
+            # CSV 输出仍用 pandas 读写，保持单元格的写法不变
+            merged = columnar and pyarrow is not None and self._merge_with_arrow(
+                csv_files, output_file, sort_fields, compression_level)
+            if not merged:
+                self._merge_in_memory(
+                    csv_files, output_file, sort_fields, compression_level)
+        else:
+            # 不排序时逐块追加写出，内存占用只与单个数据块有关
+            self._stream_merge(csv_files, output_file, compression_level)
+
+        logger.info(f"文件合并完成，保存到: {output_file}")
+
+    def _merge_in_memory(
+        self,
+        csv_files: List[Path],
+        output_file: Path,
+        sort_fields: Optional[List[str]],
+        compression_level: int
+    ) -> None:
+        """用 pandas 读取全部文件，合并、排序后写出
+
+        Args:
+            csv_files: CSV文件路径列表
+            output_file: 输出文件路径
+            sort_fields: 排序字段列表，为None时不排序
+            compression_level: 压缩等级
+        """
+        # 使用多线程读取文件，各文件在读取线程中先行排序
+        dataframes = self._read_files_parallel(csv_files, sort_fields)
 
         # 合并DataFrame
         logger.info("开始合并DataFrame")
         merged_df = pd.concat(dataframes, ignore_index=True)
         logger.info(f"合并完成，最终数据形状: {merged_df.shape}")
 
-        # 排序（如果指定了排序字段）
         if sort_fields:
             logger.info(f"按字段 {sort_fields} 进行排序")
-            merged_df = merged_df.sort_values(by=sort_fields)
+            # 稳定排序：各文件已有序，相同键保持文件顺序和文件内顺序
+            merged_df = merged_df.sort_values(by=sort_fields, kind='stable')
             merged_df = merged_df.reset_index(drop=True)
 
         # 保存文件
         self._save_dataframe(merged_df, output_file, compression_level)
-        logger.info(f"文件合并完成，保存到: {output_file}")
+
+    def _merge_with_arrow(
+        self,
+        csv_files: List[Path],
+        output_file: Path,
+        sort_fields: Optional[List[str]],
+        compression_level: int
+    ) -> bool:
+        """用 pyarrow 数据集多线程扫描全部文件，排序后直接写出 parquet / feather，
+        不经过 pandas
+
+        各文件的列取并集，缺少的列为空；类型推断冲突等 pyarrow 无法处理的情况
+        返回 False，由调用方改用 pandas 合并
+
+        Args:
+            csv_files: CSV文件路径列表
+            output_file: 输出文件路径，后缀为 .parquet 或 .feather
+            sort_fields: 排序字段列表，为None时不排序
+            compression_level: 压缩等级
+
+        Returns:
+            是否已完成合并
+        """
+        files = [str(file_path) for file_path in csv_files]
+        try:
+            schema = pyarrow.unify_schemas(
+                [pyarrow.dataset.dataset(f, format='csv').schema for f in files],
+                promote_options='permissive'
+            )
+            table = pyarrow.dataset.dataset(
+                files, format='csv', schema=schema).to_table()
+            logger.info(f"pyarrow 扫描完成，最终数据形状: ({table.num_rows}, {table.num_columns})")
+
+            if sort_fields:
+                logger.info(f"按字段 {sort_fields} 进行排序")
+                # pyarrow 的排序是稳定的，相同键保持文件顺序和文件内顺序
+                table = table.sort_by([(field, 'ascending') for field in sort_fields])
+        except pyarrow.ArrowException as e:
+            logger.warning(f"pyarrow 合并失败，改用 pandas 合并: {e}")
+            return False
+
+        logger.info(f"保存数据到 {output_file}，压缩等级: {compression_level}")
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        suffix = output_file.suffix.lower()
+        if suffix == '.parquet':
+            pyarrow.parquet.write_table(
+                table, output_file, compression='zstd',
+                compression_level=compression_level)
+        else:
+            pyarrow.feather.write_feather(table, output_file)
+        return True
 
     def _find_csv_files(self, input_dir: Path) -> List[Path]:
         """查找目录中的所有CSV文件
@@ -137,22 +246,83 @@ class Merger:
         logger.debug(f"找到的CSV文件: {[f.name for f in csv_files]}")
         return csv_files
 
-    def _read_files_parallel(self, csv_files: List[Path]) -> List[pd.DataFrame]:
-        """使用多进程并行读取CSV文件
+    def _read_files_parallel(
+        self,
+        csv_files: List[Path],
+        sort_fields: Optional[List[str]] = None
+    ) -> List[pd.DataFrame]:
+        """使用多线程并行读取CSV文件
 
         Args:
             csv_files: CSV文件路径列表
+            sort_fields: 排序字段列表，不为None时每个文件读取后先行排序
 
         Returns:
             DataFrame列表
         """
-        logger.info(f"使用 {self.max_workers} 个进程并行读取文件")
+        logger.info(f"使用 {self.max_workers} 个线程并行读取文件")
 
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-            dataframes = list(executor.map(_read_csv_file, csv_files))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            dataframes = list(executor.map(
+                partial(_read_csv_file, sort_fields=sort_fields), csv_files))
 
         return dataframes
 
+    def _stream_merge(
+        self,
+        csv_files: List[Path],
+        output_file: Path,
+        compression_level: int
+    ) -> None:
+        """按文件顺序分块读取并追加写入输出文件
+
+        输出的列为所有文件列的并集（按首次出现的顺序），
+        与 pd.concat 的结果一致，某个文件缺少的列留空。
+        各单元格按原始文本读取和写出，不做类型推断，
+        避免不同数据块推断出不同类型导致同一列混用 3 和 3.0 等写法；
+        NA、null 等空值标记与排序合并时一样写为空
+
+        Args:
+            csv_files: CSV文件路径列表
+            output_file: 输出文件路径
+            compression_level: 压缩等级
+        """
+        logger.info(f"分块合并写入 {output_file}，每块 {CHUNK_SIZE} 行")
+
+        # 只读取表头，确定输出列
+        columns: List[str] = []
+        for file_path in csv_files:
+            for column in pd.read_csv(file_path, nrows=0).columns:
+                if column not in columns:
+                    columns.append(column)
+
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._open_output(output_file, compression_level) as handle:
+            pd.DataFrame(columns=columns).to_csv(handle, index=False)
+            for file_path in csv_files:
+                logger.debug(f"正在读取文件: {file_path}")
+                reader = pd.read_csv(file_path, chunksize=CHUNK_SIZE, dtype=str)
+                for chunk in reader:
+                    chunk.reindex(columns=columns).to_csv(
+                        handle, index=False, header=False)
+
+    @staticmethod
+    def _open_output(output_file: Path, compression_level: int) -> IO[str]:
+        """以文本方式打开输出文件，.gz 后缀时使用 gzip 压缩
+
+        Args:
+            output_file: 输出文件路径
+            compression_level: 压缩等级
+
+        Returns:
+            可写入的文本文件对象
+        """
+        if output_file.suffix.lower() == '.gz':
+            return gzip.open(
+                output_file, 'wt', compresslevel=compression_level, newline='')
+        return open(output_file, 'w', newline='')
+
     def _save_dataframe(
         self,
         df: pd.DataFrame,
@@ -171,7 +341,14 @@ class Merger:
         # 确保输出目录存在
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
-        if output_file.suffix.lower() == '.gz':
+        suffix = output_file.suffix.lower()
+        if suffix == '.parquet':
+            df.to_parquet(
+                output_file, index=False, compression='zstd',
+                compression_level=compression_level)
+        elif suffix == '.feather':
+            df.to_feather(output_file)
+        elif suffix == '.gz':
             df.to_csv(
                 output_file,
                 index=False,
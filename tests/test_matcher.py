@@ -7,6 +7,7 @@ DataFrameMatcher 的测试用例
 """
 
 import unittest
+from unittest import mock
 import pandas as pd
 import numpy as np
 from pandas_solutions import DataFrameMatcher
@@ -69,6 +70,23 @@ class TestDataFrameMatcher(unittest.TestCase):
 
         self.assertIn("DataFrame B 缺少必需字段", str(context.exception))
 
+    def test_set_dataframes_null_cycle(self):
+        """测试 cycle 包含空值的 DataFrame"""
+        df_a_null = pd.DataFrame({
+            'address': ['addr1', 'addr1'],
+            'data': [1, 2],
+            'cycle': [1.5, np.nan]
+        })
+        with self.assertRaises(ValueError) as context:
+            self.matcher.set_dataframes(df_a_null, self.df_b)
+        self.assertIn("DataFrame A 的 cycle 字段包含空值", str(context.exception))
+
+        df_b_null = self.df_b.astype({'cycle': float})
+        df_b_null.loc[0, 'cycle'] = np.nan
+        with self.assertRaises(ValueError) as context:
+            self.matcher.set_dataframes(self.df_a, df_b_null)
+        self.assertIn("DataFrame B 的 cycle 字段包含空值", str(context.exception))
+
     def test_match_basic(self):
         """测试基本匹配功能"""
         self.matcher.set_dataframes(self.df_a, self.df_b)
@@ -103,6 +121,19 @@ class TestDataFrameMatcher(unittest.TestCase):
         # 所有 data 列应该是 NaN
         self.assertTrue(result['data'].isna().all())
 
+    def test_match_disjoint_addresses(self):
+        """测试 DataFrame A 与 DataFrame B 没有相同 address 的情况"""
+        df_b_disjoint = self.df_b.assign(address=['addr3'] * 5)
+
+        self.matcher.set_dataframes(self.df_a, df_b_disjoint)
+        with mock.patch.object(self.matcher, '_match_positions') as match_positions:
+            with self.assertLogs('pandas_solutions.matcher', level='WARNING'):
+                result = self.matcher.match()
+        match_positions.assert_not_called()
+
+        self.assertEqual(len(result), 5)
+        self.assertTrue(result['data'].isna().all())
+
     def test_match_exact_match(self):
         """测试精确匹配"""
         # 创建 DataFrame B 中有与 DataFrame A 完全相同的 cycle 值
@@ -120,6 +151,132 @@ class TestDataFrameMatcher(unittest.TestCase):
         self.assertEqual(result.iloc[0]['data'], 'data1_10')
         self.assertEqual(result.iloc[1]['data'], 'data1_20')
 
+    def test_match_named_index(self):
+        """测试 DataFrame B 带有命名索引时保持原始索引"""
+        df_b_named = self.df_b.set_index(pd.Index([9, 8, 7, 6, 5], name='row'))
+
+        self.matcher.set_dataframes(self.df_a, df_b_named)
+        result = self.matcher.match()
+
+        self.assertListEqual(list(result.index), [9, 8, 7, 6, 5])
+        self.assertEqual(result.index.name, 'row')
+        self.assertEqual(result.loc[9, 'data'], 'data1_10')
+        self.assertEqual(result.loc[5, 'data'], 'data2_15')
+
+    def test_match_unknown_address(self):
+        """测试 DataFrame A 中不存在的 address 及原始顺序保持"""
+        df_b_unknown = pd.DataFrame({
+            'cycle': [25, 30, 16],
+            'address': ['addr2', 'addr3', 'addr1'],
+            'way': [1, 2, 3],
+            'set': [100, 200, 300]
+        }, index=[7, 3, 5])
+
+        self.matcher.set_dataframes(self.df_a, df_b_unknown)
+        result = self.matcher.match()
+
+        self.assertListEqual(list(result.index), [7, 3, 5])
+        self.assertEqual(result.loc[7, 'data'], 'data2_25')
+        self.assertTrue(pd.isna(result.loc[3, 'data']))
+        self.assertEqual(result.loc[5, 'data'], 'data1_10')
+
+    def test_match_numpy_fallback(self):
+        """测试未安装 numba 时的 numpy 实现与内核结果一致"""
+        df_b_unknown = pd.DataFrame({
+            'cycle': [25, 30, 16, 5],
+            'address': ['addr2', 'addr3', 'addr1', 'addr1'],
+            'way': [1, 2, 3, 4],
+            'set': [100, 200, 300, 400]
+        })
+
+        for df_b in (self.df_b, df_b_unknown):
+            matcher = DataFrameMatcher()
+            matcher.set_dataframes(self.df_a, df_b)
+            expected = matcher.match()
+
+            with mock.patch('pandas_solutions.matcher.asof_backward', None):
+                fallback = DataFrameMatcher()
+                fallback.set_dataframes(self.df_a, df_b)
+                result = fallback.match()
+
+            pd.testing.assert_frame_equal(result, expected)
+
+    def test_match_categorical_address(self):
+        """测试 address 为 category 类型时的匹配结果"""
+        self.matcher.set_dataframes(self.df_a, self.df_b)
+        expected = self.matcher.match()
+
+        df_a_cat = self.df_a.astype({'address': 'category'})
+        df_b_cat = self.df_b.astype({'address': pd.CategoricalDtype(
+            ['addr3', 'addr2', 'addr1'])})
+        df_b_cat.loc[4, 'address'] = np.nan
+
+        self.matcher.set_dataframes(df_a_cat, df_b_cat)
+        result = self.matcher.match()
+
+        self.assertListEqual(list(result['data'][:4]), list(expected['data'][:4]))
+        self.assertTrue(pd.isna(result.iloc[4]['data']))
+
+    def test_match_does_not_modify_input(self):
+        """测试匹配不会修改传入的 DataFrame"""
+        df_a_before = self.df_a.copy()
+        df_b_before = self.df_b.copy()
+
+        self.matcher.set_dataframes(self.df_a, self.df_b)
+        self.matcher.match()
+
+        pd.testing.assert_frame_equal(self.df_a, df_a_before)
+        pd.testing.assert_frame_equal(self.df_b, df_b_before)
+
+    def test_set_dataframes_after_inplace_update(self):
+        """测试原地修改 DataFrame A 后重新设置数据会刷新索引"""
+        self.matcher.set_dataframes(self.df_a, self.df_b)
+        result = self.matcher.match()
+        self.assertEqual(result.iloc[0]['data'], 'data1_10')
+
+        self.df_a.loc[0, 'data'] = 'data1_10_new'
+        self.matcher.set_dataframes(self.df_a, self.df_b)
+        result = self.matcher.match()
+        self.assertEqual(result.iloc[0]['data'], 'data1_10_new')
+
+    def test_match_keeps_integer_dtype(self):
+        """测试全部匹配时保留整数 data 的 dtype，存在未匹配时转为浮点"""
+        df_a_int = self.df_a.assign(data=[1, 2, 3, 4, 5])
+
+        df_b_all = self.df_b.assign(cycle=[15, 25, 35, 16, 22])
+        self.matcher.set_dataframes(df_a_int, df_b_all)
+        result = self.matcher.match()
+        self.assertEqual(result['data'].dtype, np.int64)
+        self.assertListEqual(list(result['data']), [1, 2, 3, 4, 4])
+
+        df_b_miss = self.df_b.assign(cycle=[5, 25, 35, 16, 22])
+        self.matcher.set_dataframes(df_a_int, df_b_miss)
+        result = self.matcher.match()
+        self.assertEqual(result['data'].dtype, np.float64)
+        self.assertTrue(pd.isna(result.iloc[0]['data']))
+
+    def test_set_df_b_reuses_index(self):
+        """测试单独更换 DataFrame B 时复用 DataFrame A 的索引"""
+        self.matcher.set_dataframes(self.df_a, self.df_b)
+        self.matcher.match()
+
+        df_b_exact = pd.DataFrame({
+            'cycle': [10, 20],
+            'address': ['addr1', 'addr1'],
+            'way': [1, 2],
+            'set': [100, 200]
+        })
+        with mock.patch.object(self.matcher, '_build_index') as build_index:
+            self.matcher.set_df_b(df_b_exact)
+            result = self.matcher.match()
+        build_index.assert_not_called()
+        self.assertListEqual(list(result['data']), ['data1_10', 'data1_20'])
+
+        # 更换 DataFrame A 后需要重新建立索引
+        self.matcher.set_df_a(self.df_a.assign(data=[1, 2, 3, 4, 5]))
+        result = self.matcher.match()
+        self.assertListEqual(list(result['data']), [1, 2])
+
     def test_match_without_dataframes(self):
         """测试未设置 DataFrame 时的匹配"""
         with self.assertRaises(ValueError) as context:
@@ -127,6 +284,28 @@ class TestDataFrameMatcher(unittest.TestCase):
 
         self.assertIn("请先调用 set_dataframes 设置数据", str(context.exception))
 
+    def test_get_statistics_cached(self):
+        """测试统计信息缓存及更换 DataFrame 后失效"""
+        self.matcher.set_dataframes(self.df_a, self.df_b)
+
+        with mock.patch.object(
+            DataFrameMatcher, '_frame_statistics',
+            wraps=DataFrameMatcher._frame_statistics
+        ) as frame_statistics:
+            stats = self.matcher.get_match_statistics()
+            self.matcher.get_match_statistics()
+            self.assertEqual(frame_statistics.call_count, 2)
+
+            self.matcher.set_df_b(self.df_b.iloc[:2])
+            new_stats = self.matcher.get_match_statistics()
+            self.assertEqual(frame_statistics.call_count, 3)
+
+        self.assertEqual(stats['df_a_cycle_range'], (10, 30))
+        self.assertEqual(stats['df_b_cycle_range'], (12, 35))
+        self.assertEqual(new_stats['df_b_rows'], 2)
+        self.assertEqual(new_stats['df_b_cycle_range'], (15, 25))
+        self.assertEqual(new_stats['df_a_rows'], 5)
+
     def test_get_statistics_empty(self):
         """测试空匹配器的统计信息"""
         stats = self.matcher.get_match_statistics()
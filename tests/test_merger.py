@@ -6,10 +6,16 @@ import tempfile
 import unittest
 from pathlib import Path
 from typing import List
+from unittest import mock
 
 import pandas as pd
 
-from pandas_solutions.merger import Merger
+from pandas_solutions.merger import Merger, _read_csv_file
+
+try:
+    import pyarrow.parquet  # type: ignore[import-untyped]
+except ImportError:
+    pyarrow = None
 
 
 class TestMerger(unittest.TestCase):
@@ -49,7 +55,7 @@ class TestMerger(unittest.TestCase):
         merger_default = Merger()
         self.assertGreater(merger_default.max_workers, 0)
 
-        # 测试指定工作进程数
+        # 测试指定工作线程数
         merger_custom = Merger(max_workers=4)
         self.assertEqual(merger_custom.max_workers, 4)
 
@@ -173,6 +179,31 @@ class TestMerger(unittest.TestCase):
             [1, 2, 3, 4]
         )
 
+    def test_merge_sorting_is_stable(self) -> None:
+        """测试排序键相同时保持文件顺序和文件内顺序"""
+        files_config = [
+            {
+                'filename': 'file1.csv',
+                'data': {'key': [2, 1, 1], 'value': ['a', 'b', 'c']}
+            },
+            {
+                'filename': 'file2.csv',
+                'data': {'key': [1, 2], 'value': ['d', 'e']}
+            }
+        ]
+
+        self._create_test_csv_files(files_config)
+        output_file = self.output_dir / 'stable_sorted.csv'
+
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=output_file,
+            sort_fields=['key']
+        )
+
+        result_df = pd.read_csv(output_file)
+        self.assertListEqual(list(result_df['value']), ['b', 'c', 'd', 'a', 'e'])
+
     def test_merge_multi_column_sorting(self) -> None:
         """测试多列排序"""
         files_config = [
@@ -207,6 +238,187 @@ class TestMerger(unittest.TestCase):
         self.assertListEqual(list(result_df['priority']), expected_priorities)
         self.assertListEqual(list(result_df['value']), expected_values)
 
+    def test_merge_different_columns(self) -> None:
+        """测试不排序合并时各文件列不同的情况"""
+        files_config = [
+            {
+                'filename': 'file1.csv',
+                'data': {'id': [1, 2], 'name': ['Alice', 'Bob']}
+            },
+            {
+                'filename': 'file2.csv.gz',
+                'data': {'score': [88], 'id': [3]}
+            }
+        ]
+
+        self._create_test_csv_files(files_config)
+        output_file = self.output_dir / 'different_columns.csv.gz'
+
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=output_file
+        )
+
+        result_df = pd.read_csv(output_file, compression='gzip')
+        self.assertListEqual(list(result_df.columns), ['id', 'name', 'score'])
+        self.assertListEqual(list(result_df['id']), [1, 2, 3])
+        self.assertTrue(result_df['name'].isna().iloc[2])
+        self.assertTrue(result_df['score'].isna().iloc[0])
+
+    @unittest.skipUnless(pyarrow, "需要安装 pyarrow")
+    def test_merge_columnar_output(self) -> None:
+        """测试输出为 parquet / feather 格式"""
+        files_config = [
+            {'filename': 'file1.csv', 'data': {'id': [2, 1], 'name': ['b', 'a']}},
+            {'filename': 'file2.csv.gz', 'data': {'id': [3], 'name': ['c']}}
+        ]
+
+        self._create_test_csv_files(files_config)
+
+        parquet_file = self.output_dir / 'merged.parquet'
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=parquet_file,
+            sort_fields=['id']
+        )
+        result_df = pd.read_parquet(parquet_file)
+        self.assertListEqual(list(result_df['id']), [1, 2, 3])
+        self.assertListEqual(list(result_df['name']), ['a', 'b', 'c'])
+
+        feather_file = self.output_dir / 'merged.feather'
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=feather_file
+        )
+        result_df = pd.read_feather(feather_file)
+        self.assertListEqual(list(result_df['id']), [2, 1, 3])
+
+    @unittest.skipUnless(pyarrow is not None, "需要安装 pyarrow")
+    def test_merge_parquet_compression_level(self) -> None:
+        """测试 parquet 输出使用指定的压缩等级"""
+        files_config = [
+            {'filename': 'file1.csv', 'data': {'id': [2, 1], 'name': ['b', 'a']}}
+        ]
+
+        self._create_test_csv_files(files_config)
+        parquet_file = self.output_dir / 'merged.parquet'
+
+        with mock.patch.object(
+            pyarrow.parquet, 'write_table', wraps=pyarrow.parquet.write_table
+        ) as write_table:
+            self.merger.merge_csv_files(
+                input_dir=self.temp_dir,
+                output_file=parquet_file,
+                compression_level=9
+            )
+
+        self.assertEqual(write_table.call_args.kwargs['compression_level'], 9)
+        self.assertListEqual(list(pd.read_parquet(parquet_file)['id']), [2, 1])
+
+    def test_merge_sorting_different_columns(self) -> None:
+        """测试排序合并时各文件列不同及列类型冲突的情况"""
+        files_config = [
+            {
+                'filename': 'file1.csv',
+                'data': {'id': [2, 1], 'name': ['Bob', 'Alice']}
+            },
+            {
+                'filename': 'file2.csv.gz',
+                'data': {'score': [88.5], 'id': [3]}
+            }
+        ]
+
+        self._create_test_csv_files(files_config)
+        output_file = self.output_dir / 'sorted_different_columns.csv'
+
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=output_file,
+            sort_fields=['id']
+        )
+
+        result_df = pd.read_csv(output_file)
+        self.assertListEqual(list(result_df.columns), ['id', 'name', 'score'])
+        self.assertListEqual(list(result_df['id']), [1, 2, 3])
+        self.assertListEqual(list(result_df['name'][:2]), ['Alice', 'Bob'])
+        self.assertEqual(result_df['score'].iloc[2], 88.5)
+
+        # name 列在另一个文件中为数字，无法统一类型时仍能完成合并
+        self._create_test_csv_files([
+            {'filename': 'file3.csv', 'data': {'id': [0], 'name': [7]}}
+        ])
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=output_file,
+            sort_fields=['id']
+        )
+
+        result_df = pd.read_csv(output_file)
+        self.assertListEqual(list(result_df['id']), [0, 1, 2, 3])
+        self.assertListEqual(list(result_df['name'][:3]), ['7', 'Alice', 'Bob'])
+
+    def test_merge_keeps_cell_text(self) -> None:
+        """测试不排序合并时各单元格保持原始文本"""
+        (self.temp_dir / 'file1.csv').write_text('id,value\n1,1\n2,2\n')
+        (self.temp_dir / 'file2.csv').write_text('id,value\n3,3\n4,\n5,NA\n')
+        output_file = self.output_dir / 'cell_text.csv'
+
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=output_file
+        )
+
+        self.assertListEqual(
+            output_file.read_text().splitlines(),
+            ['id,value', '1,1', '2,2', '3,3', '4,', '5,']
+        )
+
+    def test_merge_sorted_csv_matches_unsorted(self) -> None:
+        """测试排序与不排序合并写出的 CSV 文本一致（字符串、空值、布尔值、时间戳）"""
+        (self.temp_dir / 'file1.csv').write_text(
+            'id,name,flag,ts\n'
+            '1,"a,b",True,2024-01-02 03:04:05\n'
+            '2,NA,False,2024-01-02 03:04:06\n'
+        )
+        (self.temp_dir / 'file2.csv').write_text(
+            'id,name,flag,ts\n'
+            '3,c,,\n'
+            '4,d d,True,2024-01-03 00:00:00\n'
+        )
+
+        unsorted_file = self.output_dir / 'unsorted.csv'
+        sorted_file = self.output_dir / 'sorted.csv'
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=unsorted_file
+        )
+        self.merger.merge_csv_files(
+            input_dir=self.temp_dir,
+            output_file=sorted_file,
+            sort_fields=['id']
+        )
+
+        self.assertEqual(sorted_file.read_text(), unsorted_file.read_text())
+        self.assertListEqual(sorted_file.read_text().splitlines(), [
+            'id,name,flag,ts',
+            '1,"a,b",True,2024-01-02 03:04:05',
+            '2,,False,2024-01-02 03:04:06',
+            '3,c,,',
+            '4,d d,True,2024-01-03 00:00:00',
+        ])
+
+    def test_read_csv_file_keeps_pandas_parsing(self) -> None:
+        """测试读取文件时短行补空、时间戳保持文本、重复列名自动改名"""
+        csv_file = self.temp_dir / 'file1.csv'
+        csv_file.write_text('k,v,k\n2,2024-01-02T03:04:05,x\n1\n')
+
+        result_df = _read_csv_file(csv_file, sort_fields=['k'])
+
+        self.assertListEqual(list(result_df.columns), ['k', 'v', 'k.1'])
+        self.assertListEqual(list(result_df['k']), [1, 2])
+        self.assertTrue(pd.isna(result_df['v'].iloc[0]))
+        self.assertEqual(result_df['v'].iloc[1], '2024-01-02T03:04:05')
+
     def test_empty_directory(self) -> None:
         """测试空目录的处理"""
         empty_dir = self.temp_dir / 'empty'